@@ -3,140 +3,363 @@
 Computes the mathematically optimal decision at every game state
 using exact probability distributions — no simulation needed.
 Solves the full 100x100 state space in under a second.
+evaluate() computes exact win rates for any fixed pair of strategies the same way.
 """
 
-import csv
+import os
+from functools import lru_cache
 
+import numpy as np
 
+# Without Numba, solve() and evaluate() fall back to pure NumPy
+from numba_compat import HAVE_NUMBA, njit
+
+
+# Solved tables are cached here so later runs skip the solve entirely. Bump
+# TABLES_VERSION whenever the rules or the solver change, so stale caches are
+# re-solved rather than returned.
+TABLES_FILE = 'optimal_hog_tables.npz'
+TABLES_VERSION = 1
+
+# Free Bacon points for every opponent score: largest digit + 1
+_BACON_POINTS = np.array([max(o % 10, o // 10) + 1 for o in range(100)], np.int64)
+
+
+@lru_cache(maxsize=None)
 def _precompute_dice_distributions():
     """Precompute exact outcome distributions for all (dice_type, num_rolls) combos.
 
     For k dice with d sides, the distribution accounts for Pig Out (any 1 → score 1)
-    and enumerates all non-Pig-Out sums via DP convolution over faces {2..d}.
+    and enumerates all non-Pig-Out sums by convolving the count of ways to roll
+    each face in {2..d}, one die at a time.
 
-    Returns dict: (num_sides, num_rolls) -> {outcome: probability}
+    Returns dict: (num_sides, num_rolls) -> (outcomes, probabilities), two
+    parallel arrays with one entry per possible turn score.
     """
     distributions = {}
     for num_sides in (4, 6):
+        # face_ways[v] = ways a single die shows v without Pigging Out
+        face_ways = np.ones(num_sides + 1, np.int64)
+        face_ways[:2] = 0
+
+        # ways[v] = ways k dice sum to v with no 1s; k = 0 sums to 0 one way
+        ways = np.ones(1, np.int64)
         for num_rolls in range(1, 11):
             d, k = num_sides, num_rolls
             total = d ** k
-            outcomes = {}
+            ways = np.convolve(ways, face_ways)
 
             # Probability of rolling a 1 for k dice with n sides
             no_pig_count = (d - 1) ** k
             pig_prob = (total - no_pig_count) / total
-            if pig_prob > 0:
-                outcomes[1] = pig_prob
-
-            # Calculate distribution of total values for k dice with n sides
-            ways = {0: 1}
-            for dice in range(k):
-                new_ways = {}
-                for prev_sum, count in ways.items():
-                    for face in range(2, d + 1):
-                        s = prev_sum + face
-                        new_ways[s] = new_ways.get(s, 0) + count
-                ways = new_ways
-
-            for outcome, count in ways.items():
-                outcomes[outcome] = count / total
-
-            distributions[(num_sides, num_rolls)] = outcomes
+
+            # Without 1s, k dice always sum to something in [2k, dk]
+            sums = np.arange(2 * k, d * k + 1)
+            distributions[(num_sides, num_rolls)] = (
+                np.concatenate(([1], sums)).astype(np.int16),
+                np.concatenate(([pig_prob], ways[2 * k:] / total)),
+            )
     return distributions
 
 
-def solve():
+def solve(dtype=np.float64, cache_file=None):
     """Solve for the optimal strategy at every game state via backward induction.
 
     States are processed in decreasing order of (s + o). Since scoring always
     increases the total and Swine Swap preserves it, all future states are
     guaranteed to be solved before they're needed.
 
+    Uses the compiled Numba kernel when Numba is installed, and the
+    vectorized NumPy solver otherwise. Their win_prob tables agree to within
+    ~1e-15, but they add the outcomes in different orders. In already decided
+    states (win_prob 0 or 1), several actions then tie up to rounding, and
+    best_action may differ between them there (112 states).
+
+    dtype: storage type of the win probability table. np.float32 halves the
+           table's footprint; sums are still accumulated in float64, so values
+           stay within ~1e-7 of the float64 solution (below CSV precision).
+    cache_file: optional .npz file holding previously solved tables (such as
+           TABLES_FILE). They are loaded instead of solving when present with
+           the same TABLES_VERSION and dtype, and written after solving
+           otherwise. By default nothing is cached.
+
     Returns:
-        win_prob:    100x100 list, win_prob[s][o] = P(current mover wins)
-        best_action: 100x100 list, best_action[s][o] = optimal num_rolls (0-10)
+        win_prob:    100x100 array, win_prob[s][o] = P(current mover wins)
+        best_action: 100x100 array, best_action[s][o] = optimal num_rolls (0-10)
     """
+    if cache_file and os.path.exists(cache_file):
+        with np.load(cache_file) as tables:
+            if 'version' in tables and tables['version'] == TABLES_VERSION \
+                    and tables['win_prob'].dtype == dtype:
+                return tables['win_prob'], tables['best_action']
+
     dice_dist = _precompute_dice_distributions()
+    win_prob = np.zeros(100 * 100, dtype)
+    if HAVE_NUMBA:
+        best_action = _solve_kernel(*_pack_distributions(dice_dist), win_prob)
+    else:
+        best_action = _solve_vectorized(dice_dist, win_prob)
+    win_prob = win_prob.reshape((100, 100))
+
+    if cache_file:
+        save_npz(win_prob, best_action, cache_file)
+    return win_prob, best_action
 
-    win_prob = [[0.0] * 100 for _ in range(100)]
-    best_action = [[0] * 100 for _ in range(100)]
 
-    for total in range(1998, -1, -1):
-        for s in range(max(0, total - 99), min(100, total + 1)):
+def evaluate(strategy_table, opponent_table):
+    """Exactly evaluate two fixed strategies against each other, with the same
+    backward induction as solve() but following the given actions instead of
+    maximizing.
+
+    strategy_table, opponent_table: 100x100 num_rolls (0-10) tables like
+           best_action, played by player 0 and player 1 respectively.
+
+    Returns:
+        win_prob: 2x100x100 array, win_prob[p][s][o] = P(player p wins) when
+                  p is about to move with score s against opponent score o
+    """
+    actions = np.stack((strategy_table, opponent_table)).astype(np.int64)
+    if actions.min() < 0 or actions.max() > 10:
+        raise ValueError('Strategy tables must roll 0 to 10 dice.')
+    win_prob = np.zeros((2, 100 * 100))
+    if HAVE_NUMBA:
+        _evaluate_kernel(*_packed_distributions(), actions, win_prob)
+    else:
+        _evaluate_vectorized(_precompute_dice_distributions(), actions, win_prob)
+    return win_prob.reshape((2, 100, 100))
+
+
+@lru_cache(maxsize=None)
+def _packed_distributions():
+    """_pack_distributions of the exact dice distributions, built once."""
+    return _pack_distributions(_precompute_dice_distributions())
+
+
+def _pack_distributions(dice_dist):
+    """Pack the outcome distributions into zero-padded arrays for the kernel.
+
+    Returns (pts, probs, nk) where pts[si, nr, k] and probs[si, nr, k] are the
+    k-th outcome of rolling nr dice (si = 0 for d4s, 1 for d6s), and nk[si, nr]
+    is the number of outcomes stored for that combo.
+    """
+    max_k = max(len(outcomes) for outcomes, _ in dice_dist.values())
+    pts = np.zeros((2, 11, max_k), np.int64)
+    probs = np.zeros((2, 11, max_k))
+    nk = np.zeros((2, 11), np.int64)
+    for (num_sides, num_rolls), (outcomes, outcome_probs) in dice_dist.items():
+        si = 0 if num_sides == 4 else 1
+        nk[si, num_rolls] = len(outcomes)
+        pts[si, num_rolls, :len(outcomes)] = outcomes
+        probs[si, num_rolls, :len(outcomes)] = outcome_probs
+    return pts, probs, nk
+
+
+@njit(cache=True, fastmath=True)
+def _solve_kernel(pts, probs, nk, win_prob):
+    """Backward induction over every state, compiled to native code by Numba.
+
+    Fills win_prob in place, stored flat with state (s, o) at index 100 * s + o,
+    and returns the best_action table.
+    """
+    best_action = np.empty((100, 100), np.int8)
+    max_points = pts.max()
+    gain_wr = np.empty((max_points + 1, 100))
+    winrates = np.empty((11, 100))
+
+    for total in range(198, -1, -1):
+        lo, hi = max(0, total - 99), min(100, total + 1)
+        si = 0 if total % 7 == 0 else 1
+
+        # Every action moves (s, o) to some (s + points, o), so evaluate each
+        # successor once and share it between the actions that reach it.
+        # Column i of gain_wr holds the successors of state s = lo + i.
+        for s in range(lo, hi):
             o = total - s
-            if o < 0 or o >= 1000:
-                continue
+            for points in range(1, max_points + 1):
+                # Swine Swap as a select on a non-short-circuit mask, which
+                # compiles to conditional moves instead of a branch
+                swap = (s + points == 2 * o) | (o == 2 * (s + points))
+                new_score = o if swap else s + points
+                new_opp = s + points if swap else o
+                if new_score >= 100:
+                    gain_wr[points, s - lo] = 1.0
+                elif new_opp >= 100:
+                    gain_wr[points, s - lo] = 0.0
+                else:
+                    gain_wr[points, s - lo] = 1.0 - win_prob[100 * new_opp + new_score]
+
+        # Free Bacon (deterministic): a single successor per state
+        for s in range(lo, hi):
+            winrates[0, s - lo] = gain_wr[_BACON_POINTS[total - s], s - lo]
+
+        # Roll dice: weighted sum over exact outcome distribution. Sweep one
+        # action at a time across the whole diagonal, so each outcome is
+        # loaded once per diagonal and the inner loop is contiguous.
+        for num_rolls in range(1, 11):
+            winrates[num_rolls, :hi - lo] = 0.0
+            for k in range(nk[si, num_rolls]):
+                prob = probs[si, num_rolls, k]
+                row = pts[si, num_rolls, k]
+                for i in range(hi - lo):
+                    winrates[num_rolls, i] += prob * gain_wr[row, i]
 
-            num_sides = 4 if (s + o) % 7 == 0 else 6
-            best_wr = -1.0
+        for s in range(lo, hi):
             best_roll = 0
+            for num_rolls in range(1, 11):
+                if winrates[num_rolls, s - lo] > winrates[best_roll, s - lo]:
+                    best_roll = num_rolls
+            win_prob[100 * s + total - s] = winrates[best_roll, s - lo]
+            best_action[s, total - s] = best_roll
+
+    return best_action
+
+
+@njit(cache=True)
+def _gain_winrate(next_win_prob, s, o, points):
+    """Win rate of the mover at (s, o) after scoring POINTS, where
+    next_win_prob is the flat table of the opponent, who moves next.
+    """
+    score = s + points
+    if score == 2 * o or o == 2 * score:
+        score, o = o, score
+    if score >= 100:
+        return 1.0
+    elif o >= 100:
+        return 0.0
+    return 1.0 - next_win_prob[100 * o + score]
 
-            for num_rolls in range(11):
+
+@njit(cache=True)
+def _evaluate_kernel(pts, probs, nk, actions, win_prob):
+    """evaluate()'s backward induction, compiled to native code by Numba.
+
+    Fills win_prob[p] in place, stored flat like in _solve_kernel, using
+    player p's actions[p]. Only the chosen action is scored at each state.
+    """
+    for total in range(198, -1, -1):
+        si = 0 if total % 7 == 0 else 1
+        for s in range(max(0, total - 99), min(100, total + 1)):
+            o = total - s
+            for player in range(2):
+                next_win_prob = win_prob[1 - player]
+                num_rolls = actions[player, s, o]
                 if num_rolls == 0:
-                    # Free Bacon (deterministic)
-                    bacon_points = max(o % 10, o // 10) + 1
-                    bacon_score, bacon_opp = s + bacon_points, o
-                    if bacon_score == 2 * bacon_opp or bacon_opp == 2 * bacon_score:
-                        bacon_score, bacon_opp = bacon_opp, bacon_score
-                    if bacon_score >= 100:
-                        winrate = 1.0
-                    elif bacon_opp >= 100:
-                        winrate = 0.0
-                    else:
-                        winrate = 1.0 - win_prob[bacon_opp][bacon_score]
+                    value = _gain_winrate(next_win_prob, s, o, _BACON_POINTS[o])
                 else:
-                    # Roll dice: weighted sum over exact outcome distribution
-                    winrate = 0.0
-                    for points, prob in dice_dist[(num_sides, num_rolls)].items():
-                        roll_score, roll_opp = s + points, o
-                        if roll_score == 2 * roll_opp or roll_opp == 2 * roll_score:
-                            roll_score, roll_opp = roll_opp, roll_score
-                        if roll_score >= 100:
-                            winrate += prob
-                        elif roll_opp >= 100:
-                            pass  # contributes 0
-                        else:
-                            winrate += prob * (1.0 - win_prob[roll_opp][roll_score])
-
-                if winrate > best_wr:
-                    best_wr = winrate
-                    best_roll = num_rolls
+                    value = 0.0
+                    for k in range(nk[si, num_rolls]):
+                        value += probs[si, num_rolls, k] * _gain_winrate(
+                            next_win_prob, s, o, pts[si, num_rolls, k])
+                win_prob[player, 100 * s + o] = value
 
-            win_prob[s][o] = best_wr
-            best_action[s][o] = best_roll
 
-    return win_prob, best_action
+def _action_winrates(dice_dist, total, next_win_prob):
+    """Win rate of every action (rows, 0-10 dice) at every state of the
+    antidiagonal s + o = TOTAL (columns, in increasing s), where next_win_prob
+    is the flat table of the player who moves next.
+    """
+    gains = np.arange(max(pts.max() for pts, _ in dice_dist.values()) + 1)
+    lo, hi = max(0, total - 99), min(100, total + 1)
+    s_vec = np.arange(lo, hi)
+    o_vec = total - s_vec
+
+    # gain_wr[i, p] = win rate after state i gains p points. Every action
+    # is a distribution over these successors, so each is computed once.
+    score = s_vec[:, None] + gains
+    opp = np.broadcast_to(o_vec[:, None], score.shape)
+    swap = (score == 2 * opp) | (opp == 2 * score)
+    score, opp = np.where(swap, opp, score), np.where(swap, score, opp)
+
+    successors = 100 * np.minimum(opp, 99) + np.minimum(score, 99)
+    future = 1.0 - next_win_prob.take(successors).astype(np.float64, copy=False)
+    gain_wr = np.where(score >= 100, 1.0, np.where(opp >= 100, 0.0, future))
+
+    num_sides = 4 if total % 7 == 0 else 6
+    winrates = np.empty((11, hi - lo))
+
+    # Free Bacon (deterministic): one outcome per state
+    winrates[0] = gain_wr[np.arange(hi - lo), _BACON_POINTS[o_vec]]
+
+    # Roll dice: weighted sum over exact outcome distribution
+    for num_rolls in range(1, 11):
+        pts, probs = dice_dist[(num_sides, num_rolls)]
+        winrates[num_rolls] = gain_wr[:, pts] @ probs
+    return winrates
+
+
+def _solve_vectorized(dice_dist, win_prob):
+    """Backward induction in NumPy, one antidiagonal (fixed s + o) at a time.
+
+    Every state on a diagonal is independent of the others, so each diagonal
+    is evaluated as a batch of vectors, one per action. Fills the flat win_prob
+    in place and returns the best_action table.
+    """
+    best_action = np.zeros((100, 100), np.int8)
+
+    for total in range(198, -1, -1):
+        s_vec = np.arange(max(0, total - 99), min(100, total + 1))
+        o_vec = total - s_vec
+        winrates = _action_winrates(dice_dist, total, win_prob)
+
+        # argmax keeps the first (fewest dice) action on ties
+        best_action[s_vec, o_vec] = winrates.argmax(axis=0)
+        win_prob[100 * s_vec + o_vec] = winrates.max(axis=0)
+
+    return best_action
+
+
+def _evaluate_vectorized(dice_dist, actions, win_prob):
+    """evaluate()'s backward induction in NumPy, one antidiagonal at a time.
+
+    Scores every action like _solve_vectorized, then keeps each player's
+    chosen one. Fills the flat win_prob[p] tables in place.
+    """
+    for total in range(198, -1, -1):
+        s_vec = np.arange(max(0, total - 99), min(100, total + 1))
+        o_vec = total - s_vec
+        for player in (0, 1):
+            winrates = _action_winrates(dice_dist, total, win_prob[1 - player])
+            chosen = actions[player, s_vec, o_vec]
+            win_prob[player, 100 * s_vec + o_vec] = winrates[chosen, np.arange(len(s_vec))]
 
 
 def make_optimal_strategy(best_action):
     """Create a strategy function from the solved action table."""
     def strategy(score, opponent_score):
-        return best_action[score][opponent_score]
+        return int(best_action[score][opponent_score])
     return strategy
 
 
+def save_npz(win_prob, best_action, filename=TABLES_FILE):
+    """Save the solved tables in NumPy's compressed binary format."""
+    np.savez_compressed(filename, win_prob=win_prob, best_action=best_action,
+                        version=TABLES_VERSION)
+
+
+def load_npz(filename=TABLES_FILE):
+    """Load tables written by save_npz and return (win_prob, best_action)."""
+    with np.load(filename) as tables:
+        return tables['win_prob'], tables['best_action']
+
+
 def save_csv(win_prob, best_action, filename='optimal_hog_strategy.csv'):
     """Save every state to CSV: score, opponent_score, best_roll, win_prob."""
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['score', 'opponent_score', 'best_roll', 'win_prob'])
-        for s in range(100):
-            for o in range(100):
-                writer.writerow([s, o, best_action[s][o], f'{win_prob[s][o]:.6f}'])
+    s, o = np.indices((100, 100)).reshape(2, -1)
+    rows = np.column_stack((s, o, np.ravel(best_action), np.ravel(win_prob)))
+    np.savetxt(filename, rows, fmt=['%d', '%d', '%d', '%.6f'], delimiter=',',
+               header='score,opponent_score,best_roll,win_prob', comments='',
+               newline='\r\n')
     print(f"Saved to {filename}")
 
 
 def load_csv(filename='optimal_hog_strategy.csv'):
-    """Load solved tables from CSV and return (win_prob, best_action)."""
-    win_prob = [[0.0] * 100 for _ in range(100)]
-    best_action = [[0] * 100 for _ in range(100)]
-    with open(filename, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            s, o = int(row['score']), int(row['opponent_score'])
-            best_action[s][o] = int(row['best_roll'])
-            win_prob[s][o] = float(row['win_prob'])
+    """Load solved tables from CSV and return (win_prob, best_action) arrays."""
+    rows = np.loadtxt(filename, delimiter=',', skiprows=1)
+    s, o = rows[:, 0].astype(int), rows[:, 1].astype(int)
+    win_prob = np.zeros((100, 100))
+    best_action = np.zeros((100, 100), np.int8)
+    win_prob[s, o] = rows[:, 3]
+    best_action[s, o] = rows[:, 2]
     return win_prob, best_action
 
 
@@ -152,7 +375,7 @@ def print_summary(win_prob, best_action):
 
 if __name__ == "__main__":
     print("Solving Hog (exact DP)...")
-    win_prob, best_action = solve()
+    win_prob, best_action = solve(cache_file=TABLES_FILE)
     print_summary(win_prob, best_action)
     save_csv(win_prob, best_action)
     print("\n")
\ No newline at end of file
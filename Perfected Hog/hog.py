@@ -5,6 +5,13 @@ from ucb import main, trace, log_current_line, interact
 
 GOAL_SCORE = 100 # The goal of Hog is to score 100 points.
 
+# Free Bacon points for every opponent score: largest digit + 1
+_BACON_TABLE = bytes(max(s % 10, s // 10) + 1 for s in range(100))
+
+# Dice for every score total in a game (both scores below 100): Hog wild on
+# multiples of 7. select_dice falls back to the rule itself for other totals.
+_DICE_TABLE = tuple(four_sided if t % 7 == 0 else six_sided for t in range(199))
+
 ######################
 # Phase 1: Simulator #
 ######################
@@ -22,16 +29,13 @@ def roll_dice(num_rolls, dice=six_sided):
     assert type(num_rolls) == int, 'num_rolls must be an integer.'
     assert num_rolls > 0, 'Must roll at least once.'
     
-    dice_list = []
     points = 0
+    pig_out = False
     for i in range(num_rolls):
         current_die = dice()
-        dice_list.append(current_die)
-    if 1 in dice_list:
-        points = 1 # Pig out
-    else:
-        points = sum(dice_list)
-    return points
+        pig_out = pig_out or current_die == 1
+        points += current_die
+    return 1 if pig_out else points
 
 def take_turn(num_rolls, opponent_score, dice=six_sided):
     """Simulate a turn rolling NUM_ROLLS dice, which may be 0 (Free bacon).
@@ -46,10 +50,7 @@ def take_turn(num_rolls, opponent_score, dice=six_sided):
     assert opponent_score < 100, 'The game should be over.'
     
     if num_rolls == 0:
-        opp_score_digits = []
-        opp_score_digits.append(opponent_score % 10) # ones digit
-        opp_score_digits.append(opponent_score // 10) # tens digit
-        return max(opp_score_digits) + 1
+        return _BACON_TABLE[opponent_score]
     else:
         return roll_dice(num_rolls, dice)
 
@@ -65,11 +66,13 @@ def select_dice(score, opponent_score):
     True
     >>> select_dice(0, 0) == four_sided
     True
+    >>> select_dice(100, 99) == six_sided
+    True
     """
-    if (score + opponent_score) % 7 == 0:
-        return four_sided
-    else:
-        return six_sided
+    total = score + opponent_score
+    if 0 <= total < len(_DICE_TABLE):
+        return _DICE_TABLE[total]
+    return four_sided if total % 7 == 0 else six_sided
 
 def other(who):
     """Return the other player, for a player WHO numbered 0 or 1.
@@ -93,19 +96,22 @@ def play(strategy0, strategy1, goal=GOAL_SCORE):
     strategy1:  The strategy function for Player 1, who plays second.
     """
     who = 0
-    score0, score1 = 0, 0  # Always track Player 0 and Player 1 separately
+    strategies = (strategy0, strategy1)
+    score, opponent_score = 0, 0  # The current player's score comes first
     
-    while score0 < goal and score1 < goal:
-        if who == 0:
-            score0 += take_turn(strategy0(score0, score1), score1, select_dice(score0, score1))
-        else:
-            score1 += take_turn(strategy1(score1, score0), score0, select_dice(score0, score1))
+    while score < goal and opponent_score < goal:
+        score += take_turn(strategies[who](score, opponent_score), opponent_score,
+                           select_dice(score, opponent_score))
         
-        if score0 == 2 * score1 or score1 == 2 * score0:
-            score0, score1 = score1, score0
-        who = other(who)
+        if score == 2 * opponent_score or opponent_score == 2 * score:
+            score, opponent_score = opponent_score, score
+        # Hand the turn over: the opponent becomes the current player
+        who = 1 - who
+        score, opponent_score = opponent_score, score
     
-    return score0, score1  # You may wish to change this line.
+    if who == 0:
+        return score, opponent_score
+    return opponent_score, score
 
 #######################
 # Phase 2: Strategies #
@@ -181,8 +187,8 @@ def max_scoring_num_rolls(dice=six_sided):
     10
     """
     best_score = 1
+    averaged_result = make_averaged(roll_dice, 1000)
     for i in range(10):
-        averaged_result = make_averaged(roll_dice, 1000)
         actual_value = averaged_result(i+1, dice)
         print(i+1, "dice scores", actual_value, "on average")
         if actual_value >= best_score:
@@ -0,0 +1,193 @@
+"""Numba-compiled Hog simulator for the strategy optimizer.
+
+Follows the same rules as hog.py, but a strategy is described by the five
+integer parameters of strategy_optimizer.make_parameterized_strategy (in
+PARAM_DEFS order) instead of a Python function, so that a whole game runs as
+native code. If the parameterized strategy changes, update strategy_nb to match.
+
+Dice are likewise plain side counts (4 or 6) rather than dice functions. The
+score of a dice turn depends only on (sides, num_rolls), so turns aren't rolled
+during play at all: turn_samples pre-draws a table of turn scores for each
+combination, and each game reads its turns from those tables. hog.py keeps its
+dice functions, which make_test_dice and the doctests rely on.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Without Numba, callers fall back to NumPy simulation
+from numba_compat import HAVE_NUMBA, njit, prange
+
+GOAL_SCORE = 100 # The goal of Hog is to score 100 points.
+
+# Free Bacon points for every opponent score: largest digit + 1. A global
+# array, so Numba freezes it into the compiled code as a constant.
+_BACON_POINTS = np.array([max(o % 10, o // 10) + 1 for o in range(100)], np.int64)
+
+# Pre-drawn turn scores per (sides, num_rolls): large enough that games read
+# effectively fresh samples, small enough (5.8 MB in all) to stay cache friendly
+TURN_SAMPLES_SIZE = 2 ** 18
+
+# Wald's sequential probability ratio test, used by sweep to stop playing rows
+# that are clearly no better than even: H0 win rate SPRT_P0 vs H1 SPRT_P1,
+# checked every SPRT_BATCH games once SPRT_MIN_GAMES have been played. H1 must
+# sit below the best rates against the baseline (about 0.53 against brainless),
+# or real contenders get stopped too.
+SPRT_P0, SPRT_P1 = 0.5, 0.52
+SPRT_ALPHA = SPRT_BETA = 0.05
+SPRT_BATCH = 25
+SPRT_MIN_GAMES = 100
+
+
+@njit(cache=True)
+def roll_dice_nb(num_rolls, sides):
+    """Roll NUM_ROLLS dice with SIDES sides. Return the sum, or 1 on a Pig Out."""
+    total = 0
+    pig_out = False
+    for _ in range(num_rolls):
+        roll = np.random.randint(1, sides + 1)
+        total += roll
+        pig_out |= roll == 1
+    return 1 if pig_out else total
+
+
+@njit(cache=True)
+def _draw_turn_samples(size, seed):
+    """Fill a (2, 11, SIZE) table of roll_dice_nb scores, where row [si, n]
+    holds turns of n dice (si = 0 for d4s, 1 for d6s). Row n = 0 is unused.
+    """
+    np.random.seed(seed)
+    samples = np.zeros((2, 11, size), np.int8)
+    for si in range(2):
+        sides = 4 if si == 0 else 6
+        for num_rolls in range(1, 11):
+            for i in range(size):
+                samples[si, num_rolls, i] = roll_dice_nb(num_rolls, sides)
+    return samples
+
+
+@lru_cache(maxsize=None)
+def turn_samples(size=TURN_SAMPLES_SIZE, seed=0):
+    """Return the pre-drawn turn score tables for play_nb, drawn once."""
+    return _draw_turn_samples(size, seed)
+
+
+@njit(cache=True)
+def take_turn_nb(num_rolls, opponent_score, sides, samples, cursor):
+    """Score a turn of NUM_ROLLS dice, where 0 dice means Free Bacon. A dice
+    turn scores the pre-drawn sample at CURSOR for SIDES and NUM_ROLLS.
+    """
+    if num_rolls == 0:
+        return _BACON_POINTS[opponent_score]
+    return samples[0 if sides == 4 else 1, num_rolls, cursor]
+
+
+@njit(cache=True)
+def select_dice_nb(score, opponent_score):
+    """Return 4 (Hog Wild) if the scores sum to a multiple of 7, otherwise 6."""
+    return 4 if (score + opponent_score) % 7 == 0 else 6
+
+
+@njit(cache=True)
+def strategy_nb(params, score, opponent_score):
+    """make_parameterized_strategy(*PARAMS)(SCORE, OPPONENT_SCORE), compiled.
+
+    params: (risk_dividend, cons_d6, cons_d4, agg_d6, agg_d4)
+    """
+    risk = (score - opponent_score) // params[0]
+    if (score + opponent_score) % 7 != 0:
+        return min(max(params[1], 6 - risk), params[3])
+    else:
+        return min(max(params[2], 4 - risk), params[4])
+
+
+@njit(cache=True)
+def play_nb(params0, params1, seed, samples):
+    """Simulate a game between two parameterized strategies and return the
+    final (score0, score1).
+
+    Dice turns read consecutive entries of the turn_samples tables SAMPLES,
+    starting from a position scattered by SEED, so equal seeds replay the
+    same dice without reseeding a generator for every game.
+    """
+    size = samples.shape[2]
+    cursor = np.int64((np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+                       >> np.uint64(24)) % np.uint64(size))
+    who = 0
+    params, opponent_params = params0, params1
+    score, opponent_score = 0, 0  # The current player's score comes first
+
+    while score < GOAL_SCORE and opponent_score < GOAL_SCORE:
+        num_rolls = strategy_nb(params, score, opponent_score)
+        score += take_turn_nb(num_rolls, opponent_score, select_dice_nb(score, opponent_score),
+                              samples, cursor)
+        if num_rolls > 0:
+            cursor = cursor + 1 if cursor + 1 < size else 0
+
+        if score == 2 * opponent_score or opponent_score == 2 * score:
+            score, opponent_score = opponent_score, score
+        # Hand the turn over: the opponent becomes the current player
+        who = 1 - who
+        score, opponent_score = opponent_score, score
+        params, opponent_params = opponent_params, params
+
+    if who == 0:
+        return score, opponent_score
+    return opponent_score, score
+
+
+@njit(cache=True, parallel=True)
+def batch_winrate(params, baseline_params, num_games, seed_base, samples):
+    """Play NUM_GAMES games from each seat of PARAMS against BASELINE_PARAMS,
+    spread across all cores, and return (wins_as_player_0, wins_as_player_1).
+
+    Game i of both seatings is seeded with SEED_BASE + i. Parameters are
+    int8 arrays, like every per-game array here, to keep the working set small.
+    """
+    wins0 = np.zeros(num_games, np.int8)
+    wins1 = np.zeros(num_games, np.int8)
+    for i in prange(num_games):
+        score0, score1 = play_nb(params, baseline_params, seed_base + i, samples)
+        wins0[i] = score0 > score1
+        score0, score1 = play_nb(baseline_params, params, seed_base + i, samples)
+        wins1[i] = score1 > score0
+    # Reduce after the parallel loop, so no two threads write the same total
+    return wins0.sum(), wins1.sum()
+
+
+@njit(cache=True, parallel=True)
+def sweep(param_grid, baseline_params, num_games, seed_base, samples, early_stop=False):
+    """batch_winrate for every row of the (N, 5) int8 PARAM_GRID in one call,
+    with the rows spread across all cores.
+
+    Every row plays game i with seed SEED_BASE + i (common random numbers), so
+    rows are compared on the same dice and the noise in their differences
+    shrinks. With EARLY_STOP, a row stops as soon as the SPRT accepts that its
+    win rate is no better than SPRT_P0; every other row plays all NUM_GAMES.
+    A stopped row's rate comes from fewer games and is biased low, since it
+    stopped on a losing run, so only the full-length rows rank reliably.
+
+    Returns (wins, games): an (N, 2) array of (wins_as_player_0,
+    wins_as_player_1) and an (N,) array of games played from each seat.
+    """
+    win_llr = np.log(SPRT_P1 / SPRT_P0)
+    loss_llr = np.log((1 - SPRT_P1) / (1 - SPRT_P0))
+    accept_h0 = np.log(SPRT_BETA / (1 - SPRT_ALPHA))
+
+    wins = np.zeros((param_grid.shape[0], 2), np.int32)
+    games = np.full(param_grid.shape[0], num_games, np.int32)
+    for p in prange(param_grid.shape[0]):
+        for i in range(num_games):
+            score0, score1 = play_nb(param_grid[p], baseline_params, seed_base + i, samples)
+            wins[p, 0] += score0 > score1
+            score0, score1 = play_nb(baseline_params, param_grid[p], seed_base + i, samples)
+            wins[p, 1] += score1 > score0
+
+            played = i + 1
+            if early_stop and played % SPRT_BATCH == 0 and played >= SPRT_MIN_GAMES:
+                won = wins[p, 0] + wins[p, 1]
+                if won * win_llr + (2 * played - won) * loss_llr <= accept_h0:
+                    games[p] = played
+                    break
+    return wins, games
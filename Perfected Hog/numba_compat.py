@@ -0,0 +1,16 @@
+"""Optional Numba support shared by the compiled modules.
+
+Import njit and prange from here. Without Numba, njit leaves functions as plain
+Python, prange is range, and HAVE_NUMBA is False so callers can pick a NumPy
+fallback instead of running the uncompiled loops.
+"""
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # Numba is optional
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        return lambda fn: fn
@@ -5,7 +5,6 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from matplotlib.widgets import Slider
-from scipy.ndimage import gaussian_filter
 
 CSV_FILE = 'big_optimal_hog_strategy.csv'
 INITIAL_SIGMA = 3
@@ -26,16 +25,62 @@ def _make_mesh(grid):
     return X, Y, Z
 
 
-def _build_surface(ax, X, Y, Z_raw, cmap, norm, zlabel, title, sigma):
-    """Clear axis and draw a smoothed surface."""
-    ax.clear()
-    Z = gaussian_filter(Z_raw, sigma=sigma)
+def _reflected_fft(Z_raw):
+    """FFT of Z_raw mirrored into a 2x2 tile, computed once per figure.
+
+    Mirroring makes circular convolution match gaussian_filter's default
+    'reflect' edge handling, so a slider move only needs a multiply and an
+    inverse FFT instead of a fresh spatial convolution.
+    """
+    tiled = np.block([[Z_raw, Z_raw[:, ::-1]], [Z_raw[::-1], Z_raw[::-1, ::-1]]])
+    return np.fft.rfft2(tiled)
+
+
+def _gaussian_kernel_fft(n, sigma, truncate=4.0):
+    """FFT of the 1D kernel gaussian_filter samples, wrapped onto a period of n."""
+    radius = int(truncate * sigma + 0.5)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2) if sigma > 0 else np.ones(1)
+    wrapped = np.zeros(n)
+    np.add.at(wrapped, x % n, kernel / kernel.sum())
+    return np.fft.fft(wrapped)
+
+
+def _smooth(Z_fft, shape, sigma):
+    """Gaussian-smooth the grid whose _reflected_fft is Z_fft (same as gaussian_filter)."""
+    rows, cols = shape
+    H = (_gaussian_kernel_fft(2 * rows, sigma)[:, None]
+         * _gaussian_kernel_fft(2 * cols, sigma)[None, :cols + 1])
+    return np.fft.irfft2(Z_fft * H, s=(2 * rows, 2 * cols))[:rows, :cols]
+
+
+def _build_surface(ax, X, Y, Z_fft, cmap, norm, zlabel, title, sigma):
+    """Draw a smoothed surface and return it for later _update_surface calls."""
+    Z = _smooth(Z_fft, X.shape, sigma)
     colors = plt.colormaps[cmap](norm(Z))
-    ax.plot_surface(X, Y, Z, facecolors=colors, rstride=1, cstride=1, shade=False)
+    surface = ax.plot_surface(X, Y, Z, facecolors=colors, rstride=1, cstride=1, shade=False)
+    # Fixed to the color range so the axes don't jump as smoothing changes
+    ax.set_zlim(norm.vmin, norm.vmax)
     ax.set_xlabel('Opponent Score')
     ax.set_ylabel('Your Score')
     ax.set_zlabel(zlabel)
     ax.set_title(title)
+    return surface
+
+
+def _update_surface(surface, X, Y, Z_fft, cmap, norm, sigma):
+    """Re-smooth an existing surface in place instead of rebuilding it.
+
+    Matches plot_surface(rstride=1, cstride=1): one quad per grid cell with
+    corners (i, j), (i, j+1), (i+1, j+1), (i+1, j), colored by corner (i, j).
+    """
+    Z = _smooth(Z_fft, X.shape, sigma)
+    P = np.stack((X, Y, Z), axis=-1)
+    quads = np.stack((P[:-1, :-1], P[:-1, 1:], P[1:, 1:], P[1:, :-1]), axis=2)
+    colors = plt.colormaps[cmap](norm(Z[:-1, :-1])).reshape(-1, 4)
+    surface.set_verts(quads.reshape(-1, 4, 3))
+    surface.set_facecolor(colors)
+    surface.set_edgecolor(colors)
 
 
 def interactive_plot(win_prob_grid, best_roll_grid):
@@ -46,21 +91,21 @@ def interactive_plot(win_prob_grid, best_roll_grid):
 
     configs = [
         {
-            'X': X_wp, 'Y': Y_wp, 'Z_raw': Z_wp_raw,
+            'X': X_wp, 'Y': Y_wp, 'Z_fft': _reflected_fft(Z_wp_raw),
             'cmap': 'RdYlGn', 'norm': plt.Normalize(0, 1),
             'zlabel': 'Win Probability',
             'title': 'Optimal Win Probability by Game State',
             'cbar_label': 'Win Probability',
         },
         {
-            'X': X_br, 'Y': Y_br, 'Z_raw': Z_br_raw,
+            'X': X_br, 'Y': Y_br, 'Z_fft': _reflected_fft(Z_br_raw),
             'cmap': 'viridis', 'norm': plt.Normalize(0, 10),
             'zlabel': '# of Dice',
             'title': 'Optimal Number of Dice to Roll by Game State',
             'cbar_label': 'Optimal # of Dice',
         },
         {
-            'X': X_wp, 'Y': Y_wp, 'Z_raw': Z_adv_raw,
+            'X': X_wp, 'Y': Y_wp, 'Z_fft': _reflected_fft(Z_adv_raw),
             'cmap': 'RdBu', 'norm': plt.Normalize(-0.5, 0.5),
             'zlabel': 'Advantage',
             'title': 'Win Probability Advantage by Game State',
@@ -74,9 +119,9 @@ def interactive_plot(win_prob_grid, best_roll_grid):
         ax = fig.add_subplot(111, projection='3d')
         ax.set_position([0.05, 0.12, 0.85, 0.82])
 
-        _build_surface(ax, cfg['X'], cfg['Y'], cfg['Z_raw'],
-                        cfg['cmap'], cfg['norm'], cfg['zlabel'],
-                        cfg['title'], INITIAL_SIGMA)
+        surface = _build_surface(ax, cfg['X'], cfg['Y'], cfg['Z_fft'],
+                                 cfg['cmap'], cfg['norm'], cfg['zlabel'],
+                                 cfg['title'], INITIAL_SIGMA)
         fig.colorbar(cm.ScalarMappable(norm=cfg['norm'], cmap=cfg['cmap']),
                      ax=ax, shrink=0.6, label=cfg['cbar_label'])
 
@@ -84,15 +129,14 @@ def interactive_plot(win_prob_grid, best_roll_grid):
         slider = Slider(slider_ax, 'Smoothing (σ)', 0, 10,
                         valinit=INITIAL_SIGMA, valstep=0.5)
 
-        def make_update(a, c):
+        def make_update(surf, c):
             def update(val):
-                _build_surface(a, c['X'], c['Y'], c['Z_raw'],
-                               c['cmap'], c['norm'], c['zlabel'],
-                               c['title'], val)
-                a.figure.canvas.draw_idle()
+                _update_surface(surf, c['X'], c['Y'], c['Z_fft'],
+                                c['cmap'], c['norm'], val)
+                surf.figure.canvas.draw_idle()
             return update
 
-        slider.on_changed(make_update(ax, cfg))
+        slider.on_changed(make_update(surface, cfg))
         figures.append((fig, slider))  # prevent garbage collection
 
     plt.show()
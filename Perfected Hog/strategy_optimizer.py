@@ -2,16 +2,22 @@
 
 This tool performs brute force parameter search to find optimal strategy parameters.
 All optimizer functions are generic and driven by PARAM_DEFS — to change the
-strategy, just update PARAM_DEFS, PARAM_CONSTRAINTS, and make_parameterized_strategy.
+strategy, just update PARAM_DEFS, PARAM_CONSTRAINTS, and make_parameterized_strategy
+(and its twins: make_batch_strategy, and strategy_nb in hog_fast.py; its doctest
+checks that all three agree).
 """
 
-from hog import play, brain, take_turn
-import csv
-from itertools import product
+from hog import GOAL_SCORE
+from brute_solver import evaluate
+from hog_fast import HAVE_NUMBA, batch_winrate, strategy_nb, sweep, turn_samples
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
-# Testing rigor
-coarse_games = 500
-fine_games = 2000
+import numpy as np
+
+# Testing rigor: games simulated per combination, or None to compute exact win rates
+coarse_games = None
+fine_games = None
 
 # Strategy Parameters
 """ 
@@ -39,17 +45,28 @@ def make_parameterized_strategy(*args):
     """Factory function that creates a strategy with the given parameters.
     
     Arguments are positional, matching the order in PARAM_DEFS.
-    Access parameters via the `p` dict so the body adapts to PARAM_DEFS changes.
+    Access parameters via the `p` dict so the body adapts to PARAM_DEFS changes,
+    reading them into locals up front so each call only does the arithmetic.
+
+    The optimizer plays make_batch_strategy and hog_fast.strategy_nb, which
+    must make the same choices as this strategy in every state:
+
+    >>> all(strategies_agree(*p) for p in
+    ...     [BRAINLESS_PARAMS, (10, 4, 2, 8, 6), (1, 0, 10, 10, 10), (49, 10, 0, 0, 10)])
+    True
     """
     assert len(args) == len(PARAM_DEFS), \
         f"Expected {len(PARAM_DEFS)} args ({[d[0] for d in PARAM_DEFS]}), got {len(args)}"
-    p = {name: val for (name, _, _), val in zip(PARAM_DEFS, args)}
+    p = {name: int(val) for (name, _, _), val in zip(PARAM_DEFS, args)}
+    risk_dividend = p['risk_dividend']
+    cons_d6, agg_d6 = p['cons_d6'], p['agg_d6']
+    cons_d4, agg_d4 = p['cons_d4'], p['agg_d4']
 
     def strategy(score, opponent_score):
         lead = score - opponent_score
-        risk = lead // p['risk_dividend']
-        d6_best = min(max(p['cons_d6'], 6 - risk), p['agg_d6'])
-        d4_best = min(max(p['cons_d4'], 4 - risk), p['agg_d4'])
+        risk = lead // risk_dividend
+        d6_best = min(max(cons_d6, 6 - risk), agg_d6)
+        d4_best = min(max(cons_d4, 4 - risk), agg_d4)
         dist_to_d4 = (score + opponent_score) % 7
         if dist_to_d4 != 0:
             return d6_best
@@ -57,21 +74,133 @@ def make_parameterized_strategy(*args):
             return d4_best
     return strategy
 
-def test_strategy(strategy, opponent_strategy, num_games=500):
-    """Test a strategy against an opponent and return win rate.
+def make_batch_strategy(*args):
+    """make_parameterized_strategy for batch_play and brute_solver.evaluate.
+
+    The result takes arrays of scores (one entry per game or state) and returns
+    an array of dice counts, so a whole batch is decided at once.
+    """
+    assert len(args) == len(PARAM_DEFS), \
+        f"Expected {len(PARAM_DEFS)} args ({[d[0] for d in PARAM_DEFS]}), got {len(args)}"
+    p = {name: val for (name, _, _), val in zip(PARAM_DEFS, args)}
+    risk_dividend = p['risk_dividend']
+    cons_d6, agg_d6 = p['cons_d6'], p['agg_d6']
+    cons_d4, agg_d4 = p['cons_d4'], p['agg_d4']
+
+    def strategy(score, opponent_score):
+        lead = score - opponent_score
+        risk = lead // risk_dividend
+        d6_best = np.minimum(np.maximum(cons_d6, 6 - risk), agg_d6)
+        d4_best = np.minimum(np.maximum(cons_d4, 4 - risk), agg_d4)
+        dist_to_d4 = (score + opponent_score) % 7
+        return np.where(dist_to_d4 != 0, d6_best, d4_best)
+    return strategy
+
+def strategies_agree(*args):
+    """Return whether make_parameterized_strategy, make_batch_strategy and
+    hog_fast.strategy_nb choose the same dice for ARGS in every state."""
+    strategy = make_parameterized_strategy(*args)
+    score, opponent_score = np.indices((GOAL_SCORE, GOAL_SCORE))
+    table = np.broadcast_to(make_batch_strategy(*args)(score, opponent_score), score.shape)
+    params = np.asarray(args, np.int8)
+    return all(strategy(s, o) == table[s, o] == strategy_nb(params, s, o)
+               for s in range(GOAL_SCORE) for o in range(GOAL_SCORE))
+
+def check_params(params):
+    """Raise ValueError unless PARAMS, one parameter tuple or a sequence of
+    them in PARAM_DEFS order, describes strategies that can be played:
+    risk_dividend at least 1 and every other parameter (a dice count) in 0-10.
+
+    The compiled simulator doesn't check its dice counts, so this guards it.
+    """
+    grid = np.reshape(params, (-1, len(PARAM_DEFS)))
+    if not grid.size:
+        return
+    names = [d[0] for d in PARAM_DEFS]
+    risk_dividend = grid[:, names.index('risk_dividend')]
+    dice = np.delete(grid, names.index('risk_dividend'), axis=1)
+    if risk_dividend.min() < 1 or dice.min() < 0 or dice.max() > 10:
+        raise ValueError('Strategy parameters need risk_dividend >= 1 and 0 to 10 dice.')
+
+def batch_play(strategy0, strategy1, num_games, goal=GOAL_SCORE, rng=None):
+    """Simulate NUM_GAMES independent games of Hog at once, following the same
+    rules as hog.play, and return the final (score0, score1) arrays.
+
+    Every game starts with Player 0 and players alternate, so all unfinished
+    games share the same current player on each turn. Each turn is then a
+    handful of array operations over the games that are still running.
+
+    strategy0, strategy1: batch strategies, mapping arrays of (score,
+                          opponent_score) to an array of dice counts.
+    rng:                  optional numpy Generator used for the dice.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    scores = np.zeros((2, num_games), np.int64)
+    running = np.arange(num_games)
+    who = 0
+
+    while running.size:
+        score, opponent_score = scores[who, running], scores[1 - who, running]
+        strategy = strategy0 if who == 0 else strategy1
+        num_rolls = np.broadcast_to(strategy(score, opponent_score), running.shape)
+
+        # Roll a full hand of 10 dice per game and keep the first num_rolls
+        sides = np.where((score + opponent_score) % 7 == 0, 4, 6)
+        rolls = rng.integers(1, sides[:, None] + 1, size=(running.size, 10))
+        rolls[np.arange(10) >= num_rolls[:, None]] = 0
+        pig_out = (rolls == 1).any(axis=1)
+        free_bacon = np.maximum(opponent_score % 10, opponent_score // 10) + 1
+        score = score + np.where(num_rolls == 0, free_bacon,
+                                 np.where(pig_out, 1, rolls.sum(axis=1)))
+
+        # Swine Swap, then write back and drop the games that just ended
+        swap = (score == 2 * opponent_score) | (opponent_score == 2 * score)
+        scores[who, running] = np.where(swap, opponent_score, score)
+        scores[1 - who, running] = np.where(swap, score, opponent_score)
+        running = running[(scores[0, running] < goal) & (scores[1, running] < goal)]
+        who = 1 - who
+
+    return scores[0], scores[1]
+
+def test_strategy(params, opponent_params, num_games=500, seed=None):
+    """Test a parameterized strategy against an opponent and return win rate.
+
+    Both strategies are given as parameter tuples in PARAM_DEFS order. Games run
+    in parallel through the compiled hog_fast.batch_winrate when Numba is
+    installed, and through batch_play otherwise.
+
+    Pass a SEED to make the result reproducible. Seeded results are memoized on
+    (params, opponent_params, num_games, seed), so retesting a pair is free.
+
+    With num_games=None no games are played: the win rates are computed exactly
+    by brute_solver.evaluate (and memoized, since they are deterministic).
     
     Returns: (win_rate_as_player_0, win_rate_as_player_1, overall_win_rate)
     """
-    wins_as_0 = 0
-    wins_as_1 = 0
-    
-    for _ in range(num_games):
-        score0, score1 = play(strategy, opponent_strategy)
-        if score0 > score1:
-            wins_as_0 += 1
-        score0, score1 = play(opponent_strategy, strategy)
-        if score1 > score0:
-            wins_as_1 += 1
+    check_params([params, opponent_params])
+    if num_games is None:
+        return _exact_test_strategy(tuple(params), tuple(opponent_params))
+    if seed is None:
+        seed = np.random.randint(2**31 - num_games)
+        return _seeded_test_strategy.__wrapped__(params, opponent_params, num_games, seed)
+    return _seeded_test_strategy(tuple(params), tuple(opponent_params), num_games, seed)
+
+@lru_cache(maxsize=None)
+def _seeded_test_strategy(params, opponent_params, num_games, seed):
+    """test_strategy with every game's dice determined by SEED."""
+    if HAVE_NUMBA:
+        params = np.asarray(params, np.int8)
+        opponent_params = np.asarray(opponent_params, np.int8)
+        wins_as_0, wins_as_1 = batch_winrate(params, opponent_params, num_games, seed,
+                                             turn_samples())
+    else:
+        rng = np.random.default_rng(seed)
+        strategy = make_batch_strategy(*params)
+        opponent_strategy = make_batch_strategy(*opponent_params)
+        score0, score1 = batch_play(strategy, opponent_strategy, num_games, rng=rng)
+        wins_as_0 = np.count_nonzero(score0 > score1)
+        score0, score1 = batch_play(opponent_strategy, strategy, num_games, rng=rng)
+        wins_as_1 = np.count_nonzero(score1 > score0)
     
     win_rate_0 = wins_as_0 / num_games
     win_rate_1 = wins_as_1 / num_games
@@ -79,6 +208,20 @@ def test_strategy(strategy, opponent_strategy, num_games=500):
     
     return win_rate_0, win_rate_1, overall_win_rate
 
+@lru_cache(maxsize=None)
+def _exact_test_strategy(params, opponent_params):
+    """test_strategy's win rates from exact dynamic programming."""
+    score, opponent_score = np.indices((100, 100))
+    tables = [np.broadcast_to(make_batch_strategy(*p)(score, opponent_score), (100, 100))
+              for p in (params, opponent_params)]
+    win_prob = evaluate(*tables)
+    
+    win_rate_0 = float(win_prob[0, 0, 0])
+    win_rate_1 = float(1 - win_prob[1, 0, 0])
+    overall_win_rate = (win_rate_0 + win_rate_1) / 2
+    
+    return win_rate_0, win_rate_1, overall_win_rate
+
 def brainless_strategy(score, opponent_score):
     dist_to_d4 = (score + opponent_score) % 7
     if dist_to_d4 != 0:
@@ -86,60 +229,151 @@ def brainless_strategy(score, opponent_score):
     else:
         return 4
 
+# brainless_strategy as a parameter tuple: 6 dice on d6s and 4 on d4s, whatever the lead
+BRAINLESS_PARAMS = (1, 6, 4, 6, 4)
+
+def evaluate_combo(combo, num_games, baseline_params=BRAINLESS_PARAMS, seed=None):
+    """Test the strategy built from one parameter combo against the baseline.
+
+    Lives at module level (not as a closure) so that worker processes can
+    unpickle it. Returns (combo, (win_rate_0, win_rate_1, overall_win_rate)).
+    """
+    return combo, test_strategy(combo, baseline_params, num_games, seed)
+
 def default_validate(args):
     """Validation driven by PARAM_CONSTRAINTS: each (lo, hi) pair must satisfy lo <= hi."""
     p = {name: val for (name, _, _), val in zip(PARAM_DEFS, args)}
     return all(p[lo] <= p[hi] for lo, hi in PARAM_CONSTRAINTS)
 
-def optimize_strategy(param_defs, num_games, validate=None, output_file='strategy_results.csv'):
+def constrained_product(param_defs, constraints=()):
+    """Yield the combinations of the param_defs grids that satisfy CONSTRAINTS.
+
+    Same order as itertools.product over the parameter ranges, but each
+    (lo, hi) constraint bounds the later parameter's range by the value already
+    chosen for the earlier one, so violating combinations are never generated.
+    """
+    names = [p[0] for p in param_defs]
+    ranges = [range(p[1][0], p[1][1] + 1, p[2]) for p in param_defs]
+
+    # floors[i]/ceilings[i]: earlier parameters that param i must be >=/<=
+    floors = [[] for _ in names]
+    ceilings = [[] for _ in names]
+    for lo, hi in constraints:
+        i, j = names.index(lo), names.index(hi)
+        if i < j:
+            floors[j].append(i)
+        else:
+            ceilings[i].append(j)
+
+    def walk(combo):
+        k = len(combo)
+        if k == len(names):
+            yield tuple(combo)
+            return
+        floor = max((combo[i] for i in floors[k]), default=float('-inf'))
+        ceiling = min((combo[i] for i in ceilings[k]), default=float('inf'))
+        for val in ranges[k]:
+            if floor <= val <= ceiling:
+                combo.append(val)
+                yield from walk(combo)
+                combo.pop()
+
+    return walk([])
+
+def optimize_strategy(param_defs, num_games, validate=None, constraints=(),
+                      output_file='strategy_results.csv', seed=None, early_stop=True):
     """
     Brute force search for optimal strategy parameters.
+
+    Combinations are independent, so they are spread across every CPU core:
+    all at once through the compiled hog_fast.sweep when Numba is installed,
+    and across a pool of worker processes otherwise. Exact evaluation
+    (num_games=None) runs serially when compiled, and in the pool otherwise.
+
+    Every combination is tested with the same seed (common random numbers), so
+    they all face the same dice and their ranking is less noisy.
     
     Parameters:
         param_defs: list of (name, (min, max), step) tuples
-        num_games:  number of games to simulate per configuration
+        num_games:  number of games to simulate per configuration, or None to
+                    compute each configuration's win rates exactly
         validate:   optional function(args_tuple) -> bool; False skips the combo
+        constraints: (lo, hi) name pairs like PARAM_CONSTRAINTS; combos breaking
+                     them are pruned during enumeration instead of filtered after
         output_file: CSV file to save results
+        seed:        seed shared by every combination; drawn at random if None
+        early_stop:  stop simulating a combination once a sequential test shows
+                     it is no better than even against the baseline (compiled
+                     simulation only; see the SPRT settings in hog_fast). The
+                     rates of stopped combinations come from fewer games and
+                     lean low
     
     Returns:
-        List of result dicts sorted by win rate (descending).
+        Structured array with one record per combination, sorted by win rate
+        (descending). Each record has a field per parameter name, plus
+        'win_rate_as_p0', 'win_rate_as_p1' and 'overall_win_rate'.
     """
     param_names = [p[0] for p in param_defs]
-    ranges = [range(p[1][0], p[1][1] + 1, p[2]) for p in param_defs]
-    all_combinations = list(product(*ranges))
+    all_combinations = [combo for combo in constrained_product(param_defs, constraints)
+                        if not validate or validate(combo)]
     total_combinations = len(all_combinations)
+    check_params(all_combinations)
     
     print(f"Testing {total_combinations} parameter combinations...")
-    print(f"Running {num_games} games per combination against the baseline strategy...")
+    if num_games is None:
+        print("Computing exact win rates against the baseline strategy...")
+    else:
+        print(f"Running {num_games} games per combination against the baseline strategy...")
     print()
     
-    results = []
-    baseline_strategy = brainless_strategy
-    
-    for idx, combo in enumerate(all_combinations, 1):
-        if validate and not validate(combo):
-            continue
-            
-        strategy = make_parameterized_strategy(*combo)
-        win_rate_0, win_rate_1, overall = test_strategy(strategy, baseline_strategy, num_games)
-        
-        result = {name: val for name, val in zip(param_names, combo)}
-        result['win_rate_as_p0'] = win_rate_0
-        result['win_rate_as_p1'] = win_rate_1
-        result['overall_win_rate'] = overall
-        results.append(result)
-        
-        if idx % 10 == 0 or idx == total_combinations:
-            print(f"Progress: {idx}/{total_combinations} ({100*idx/total_combinations:.1f}%)")
-    
-    results.sort(key=lambda x: x['overall_win_rate'], reverse=True)
+    # One row per combination: parameter values, and (p0, p1, overall) win rates
+    params = np.empty((total_combinations, len(param_names)), np.int64)
+    rates = np.empty((total_combinations, 3))
+    
+    if seed is None and num_games is not None:
+        seed = np.random.randint(2**31 - num_games)
+    
+    if HAVE_NUMBA and num_games is None:
+        # Compiled exact evaluation takes about a millisecond per combination
+        params[:] = np.reshape(all_combinations, params.shape)
+        for idx, combo in enumerate(all_combinations):
+            rates[idx] = test_strategy(combo, BRAINLESS_PARAMS, None)
+    elif HAVE_NUMBA:
+        params[:] = np.reshape(all_combinations, params.shape)
+        # int8 (range-checked on conversion) keeps the whole grid cache resident
+        param_grid = np.reshape(np.array(all_combinations, np.int8), params.shape)
+        wins, games = sweep(param_grid, np.asarray(BRAINLESS_PARAMS, np.int8), num_games, seed,
+                            turn_samples(), early_stop)
+        rates[:, :2] = wins / games[:, None]
+        rates[:, 2] = rates[:, :2].mean(axis=1)
+        if early_stop and total_combinations:
+            print(f"Early stopping skipped {1 - games.sum() / (num_games * total_combinations):.1%} of games")
+    else:
+        # Large chunks amortize the pickling round trip to the workers
+        with ProcessPoolExecutor() as executor:
+            outcomes = executor.map(partial(evaluate_combo, num_games=num_games, seed=seed),
+                                    all_combinations, chunksize=64)
+            for idx, (combo, win_rates) in enumerate(outcomes, 1):
+                params[idx - 1] = combo
+                rates[idx - 1] = win_rates
+                
+                if idx % 10 == 0 or idx == total_combinations:
+                    print(f"Progress: {idx}/{total_combinations} ({100*idx/total_combinations:.1f}%)")
+    
+    order = np.argsort(-rates[:, 2], kind='stable')
+    params, rates = params[order], rates[order]
     
     # Save to CSV
-    fieldnames = param_names + ['win_rate_as_p0', 'win_rate_as_p1', 'overall_win_rate']
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
+    rate_names = ['win_rate_as_p0', 'win_rate_as_p1', 'overall_win_rate']
+    fieldnames = param_names + rate_names
+    np.savetxt(output_file, np.column_stack((params, rates)),
+               fmt=['%d'] * len(param_names) + ['%s'] * 3, delimiter=',',
+               header=','.join(fieldnames), comments='', newline='\r\n')
+    
+    results = np.empty(total_combinations, [(name, np.int64) for name in param_names] +
+                                           [(name, np.float64) for name in rate_names])
+    for name, column in zip(fieldnames, np.column_stack((params, rates)).T):
+        results[name] = column
     
     # Print top results
     col_width = max(len(n) for n in param_names) + 2
@@ -157,17 +391,19 @@ def optimize_strategy(param_defs, num_games, validate=None, output_file='strateg
     
     return results
 
-def refine_search(best_result, param_defs, num_games=2000, validate=None,
-                  output_file='refined_results.csv'):
+def refine_search(best_result, param_defs, num_games=2000, validate=None, constraints=(),
+                  output_file='refined_results.csv', seed=None):
     """
     Refine search around the best parameters found in coarse search.
     
     Parameters:
-        best_result: dict returned by optimize_strategy (one entry from the results list)
+        best_result: one record of the results returned by optimize_strategy
         param_defs:  the same PARAM_DEFS used for the coarse search
-        num_games:   number of games to test
+        num_games:   number of games to test, or None for exact win rates
         validate:    optional validation function
+        constraints: ordering constraints, as in optimize_strategy
         output_file: where to save refined results
+        seed:        common seed for every combination, as in optimize_strategy
     """
     param_names = [p[0] for p in param_defs]
     best_vals = [best_result[n] for n in param_names]
@@ -179,24 +415,27 @@ def refine_search(best_result, param_defs, num_games=2000, validate=None,
         for (name, (lo, hi), _), val in zip(param_defs, best_vals)
     ]
     
-    return optimize_strategy(refined_defs, num_games, validate=validate, output_file=output_file)
+    return optimize_strategy(refined_defs, num_games, validate=validate,
+                             constraints=constraints, output_file=output_file, seed=seed)
 
 def test_against_previous_best(current_params, previous_params, param_defs=PARAM_DEFS,
-                               num_games=1000):
+                               num_games=1000, seed=None):
     """
     Test the current best parameters against the previous best.
+
+    With a fixed seed, repeating a comparison returns the memoized result.
     
     Returns the win rate of current against previous.
     """
     param_names = [p[0] for p in param_defs]
-    current_strategy = make_parameterized_strategy(*(current_params[n] for n in param_names))
-    previous_strategy = make_parameterized_strategy(*(previous_params[n] for n in param_names))
+    current = tuple(int(current_params[n]) for n in param_names)
+    previous = tuple(int(previous_params[n]) for n in param_names)
     
-    _, _, win_rate = test_strategy(current_strategy, previous_strategy, num_games)
+    _, _, win_rate = test_strategy(current, previous, num_games, seed)
     
     print(f"\nCurrent params vs Previous params:")
-    print(f"Current: {current_params}")
-    print(f"Previous: {previous_params}")
+    print(f"Current: {dict(zip(param_names, current))}")
+    print(f"Previous: {dict(zip(param_names, previous))}")
     print(f"Win rate: {win_rate:.4f}")
     
     return win_rate
@@ -211,7 +450,7 @@ if __name__ == "__main__":
     results = optimize_strategy(
         PARAM_DEFS,
         num_games=coarse_games,
-        validate=default_validate,
+        constraints=PARAM_CONSTRAINTS,
         output_file='strategy_results_coarse.csv'
     )
     
@@ -228,7 +467,7 @@ if __name__ == "__main__":
         best_coarse,
         PARAM_DEFS,
         num_games=fine_games,
-        validate=default_validate,
+        constraints=PARAM_CONSTRAINTS,
         output_file='strategy_results_refined.csv'
     )
     
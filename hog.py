@@ -2,10 +2,16 @@
 
 from dice import four_sided, six_sided, make_test_dice
 from ucb import main, trace, log_current_line, interact
-from itertools import product
 
 GOAL_SCORE = 100 # The goal of Hog is to score 100 points.
 
+# Free Bacon points for every opponent score: largest digit + 1
+_BACON_TABLE = bytes(max(s % 10, s // 10) + 1 for s in range(100))
+
+# Dice for every score total in a game (both scores below 100): Hog wild on
+# multiples of 7. select_dice falls back to the rule itself for other totals.
+_DICE_TABLE = tuple(four_sided if t % 7 == 0 else six_sided for t in range(199))
+
 ######################
 # Phase 1: Simulator #
 ######################
@@ -42,10 +48,7 @@ def take_turn(num_rolls, opponent_score, dice=six_sided):
     assert opponent_score < 100, 'The game should be over.'
     
     if num_rolls == 0:
-        opp_score_digits = []
-        opp_score_digits.append(opponent_score % 10) # ones digit
-        opp_score_digits.append(opponent_score // 10) # tens digit
-        return max(opp_score_digits) + 1
+        return _BACON_TABLE[opponent_score]
     else:
         return roll_dice(num_rolls, dice)
 
@@ -61,11 +64,24 @@ def select_dice(score, opponent_score):
     True
     >>> select_dice(0, 0) == four_sided
     True
+    >>> select_dice(100, 99) == six_sided
+    True
     """
-    if (score + opponent_score) % 7 == 0:
-        return four_sided
-    else:
-        return six_sided
+    total = score + opponent_score
+    if 0 <= total < len(_DICE_TABLE):
+        return _DICE_TABLE[total]
+    return four_sided if total % 7 == 0 else six_sided
+
+def is_hog_wild(score, opponent_score):
+    """Return whether SCORE and OPPONENT_SCORE sum to a multiple of 7, so the
+    current player rolls four-sided dice this turn (Hog wild).
+
+    >>> is_hog_wild(4, 24)
+    True
+    >>> is_hog_wild(16, 64)
+    False
+    """
+    return (score + opponent_score) % 7 == 0
 
 def other(who):
     """Return the other player, for a player WHO numbered 0 or 1.
@@ -89,19 +105,22 @@ def play(strategy0, strategy1, goal=GOAL_SCORE):
     strategy1:  The strategy function for Player 1, who plays second.
     """
     who = 0
-    score0, score1 = 0, 0  # Always track Player 0 and Player 1 separately
+    strategies = (strategy0, strategy1)
+    score, opponent_score = 0, 0  # The current player's score comes first
     
-    while score0 < goal and score1 < goal:
-        if who == 0:
-            score0 += take_turn(strategy0(score0, score1), score1, select_dice(score0, score1))
-        else:
-            score1 += take_turn(strategy1(score1, score0), score0, select_dice(score0, score1))
+    while score < goal and opponent_score < goal:
+        score += take_turn(strategies[who](score, opponent_score), opponent_score,
+                           select_dice(score, opponent_score))
         
-        if score0 == 2 * score1 or score1 == 2 * score0:
-            score0, score1 = score1, score0
-        who = other(who)
+        if score == 2 * opponent_score or opponent_score == 2 * score:
+            score, opponent_score = opponent_score, score
+        # Hand the turn over: the opponent becomes the current player
+        who = 1 - who
+        score, opponent_score = opponent_score, score
     
-    return score0, score1  # You may wish to change this line.
+    if who == 0:
+        return score, opponent_score
+    return opponent_score, score
 
 #######################
 # Phase 2: Strategies #
@@ -121,11 +140,7 @@ def simple_strategy(score,opponent_score):
         risk = lead // risk_dividend # used to change die rolls and influence some other decisions
         d6_best = min(max(3, 6 - risk), 9)
         d4_best = min(max(0, 4 - risk), 0) # I tested this many times to confirm, if you're just rolling dice, bacon is better than d4s on average, based on testing
-        dist_to_d4 = score + opponent_score % 7 # how many points I need to earn this turn to make my opponent roll d4s
-        if dist_to_d4 != 0: # determines die type on this turn
-            rolling_d6 = True
-        else:
-            rolling_d6 = False
+        rolling_d6 = not is_hog_wild(score, opponent_score) # determines die type on this turn
         if rolling_d6:
             return d6_best
         else:
@@ -179,9 +194,14 @@ def max_scoring_num_rolls(dice=six_sided):
     10
     """
     best_score = 1
-    for i in range(10):
+    if dice in (six_sided, four_sided):
+        # Fair dice have an exact average, so there's nothing to simulate
+        averages = find_average_points(dice)
+    else:
         averaged_result = make_averaged(roll_dice,2000)
-        actual_value = averaged_result(i+1, dice)
+        averages = [averaged_result(i+1, dice) for i in range(10)]
+    for i in range(10):
+        actual_value = averages[i]
         print(i+1, "dice scores", actual_value, "on average")
         if actual_value >= best_score:
             best_score = actual_value
@@ -208,20 +228,21 @@ def find_average_points(dice=six_sided):
     """
     A better version of make_averaged() that doesn't use random simulation.
     Funny story: This function was originally about 10 times as long, and I may or may not have tried to convert every number from 1 to 6^10 to base 6 and then make a tuple from their digits...
+    Now it's closed form: with no 1s (chance ((s-1)/s)^n) each die averages (2+...+s)/(s-1) = (s+2)/2, otherwise the turn scores 1.
+
+    >>> find_average_points(four_sided)[:2]
+    [2.5, 3.8125]
     """
     if dice == six_sided:
-        type = 7
+        sides = 6
     else:
-        type = 5
+        sides = 4
 
-    for i in range(10):
-        all_combos = list(product(range(1, type), repeat=i+1))
-        all_rolls = []
-        for permutation in all_combos:
-            all_rolls.append(roll_dice(len(permutation), make_test_dice(*permutation)))
-        print(sum(all_rolls)/len(all_rolls))
-
-    return
+    averages = []
+    for n in range(1, 11):
+        no_pig_out = ((sides - 1) / sides) ** n
+        averages.append(no_pig_out * n * (sides + 2) / 2 + (1 - no_pig_out))
+    return averages
 
 # Test Strategy
 # I change this function to test a variety of things. It has no consistent goal, and is just for speeding up some space searching.
@@ -233,11 +254,7 @@ def test(score,opponent_score):
         risk = lead // risk_dividend # used to change die rolls and influence some other decisions
         d6_best = min(max(4, 6 - risk), 6)
         d4_best = min(max(4, 4 - risk), 4)
-        dist_to_d4 = score + opponent_score % 7 # how many points I need to earn this turn to make my opponent roll d4s
-        if dist_to_d4 != 0: # determines die type on this turn
-            rolling_d6 = True
-        else:
-            rolling_d6 = False
+        rolling_d6 = not is_hog_wild(score, opponent_score) # determines die type on this turn
         if rolling_d6:
             return d6_best
         else:
@@ -263,7 +280,7 @@ def run_experiments():
     if False: # Change to True to test final_strategy
         print('final_strategy win rate:', average_win_rate(final_strategy))
 
-    if False: # finds the mathematic average score for each number of dice rolls. Like the first experiment, but better (and slower).
+    if False: # finds the mathematic average score for each number of dice rolls. Like the first experiment, but exact.
         six_sided_average = find_average_points(six_sided)
         four_sided_average = find_average_points(four_sided)
         print('Max scoring num rolls for six-sided dice:', six_sided_average)